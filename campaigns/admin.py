@@ -1,11 +1,132 @@
 from django.contrib import admin
-from django.apps import apps
-from django.contrib.admin.sites import AlreadyRegistered
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
-app = apps.get_app_config('campaigns')
+from .models import Customer, Campaign, CampaignCustomer, CampaignUsageLog, ChangeEvent
 
-for model in app.get_models():
-    try:
-        admin.site.register(model)
-    except AlreadyRegistered:
-        pass
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the planner's row estimate instead of COUNT(*) for unfiltered querysets on PostgreSQL once
+    the table is large enough for the estimate to matter; everything else is counted exactly.
+    """
+    exact_count_threshold = 100000
+
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        if not query.where:
+            estimate = self._estimated_count(self.object_list)
+            if estimate is not None and estimate >= self.exact_count_threshold:
+                return estimate
+        return super().count
+
+    @staticmethod
+    def _estimated_count(queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                           [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        # reltuples is -1 until the table has been vacuumed or analyzed.
+        return int(row[0]) if row and row[0] >= 0 else None
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ('-id',)
+
+
+@admin.register(Customer)
+class CustomerAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'email')
+    search_fields = ('email', 'name')
+
+
+class CampaignCustomerInline(admin.TabularInline):
+    """
+    Shows one page of a campaign's existing targets, selected with the `targets_page` query parameter.
+    The customer is read-only so rendering a page does not look up each row's widget choice.
+    """
+    model = CampaignCustomer
+    fields = ('customer',)
+    readonly_fields = ('customer',)
+    extra = 0
+    per_page = 50
+    page = None
+    template = 'admin/campaigns/campaigncustomer/paginated_tabular.html'
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        object_id = request.resolver_match.kwargs.get('object_id')
+        if object_id is None:
+            return queryset.none()
+        paginator = Paginator(
+            queryset.filter(campaign_id=object_id).order_by('id').values_list('id', flat=True), self.per_page
+        )
+        self.page = paginator.get_page(request.GET.get('targets_page'))
+        return queryset.filter(id__in=list(self.page.object_list)).select_related('customer').order_by('id')
+
+
+class NewCampaignCustomerInline(admin.TabularInline):
+    model = CampaignCustomer
+    autocomplete_fields = ('customer',)
+    extra = 1
+    verbose_name_plural = 'add target customers'
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).none()
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Campaign)
+class CampaignAdmin(LargeTableAdmin):
+    list_display = ('name', 'discount_type', 'discount_amount', 'start_date', 'end_date', 'budget', 'total_spent')
+    list_filter = ('discount_type',)
+    search_fields = ('name',)
+    inlines = (CampaignCustomerInline, NewCampaignCustomerInline)
+
+
+@admin.register(CampaignCustomer)
+class CampaignCustomerAdmin(LargeTableAdmin):
+    list_display = ('id', 'campaign', 'customer')
+    list_select_related = ('campaign', 'customer')
+    autocomplete_fields = ('campaign', 'customer')
+
+
+@admin.register(CampaignUsageLog)
+class CampaignUsageLogAdmin(LargeTableAdmin):
+    list_display = ('date', 'campaign', 'customer', 'usage_count')
+    list_select_related = ('campaign', 'customer')
+    autocomplete_fields = ('campaign', 'customer')
+    date_hierarchy = 'date'
+    ordering = ('-date', '-id')
+
+
+@admin.register(ChangeEvent)
+class ChangeEventAdmin(LargeTableAdmin):
+    """Outbox rows are consumed downstream as the record of what changed, so they can only be viewed."""
+    list_display = ('id', 'entity', 'entity_id', 'action', 'created_at')
+    list_filter = ('entity', 'action')
+    readonly_fields = ('entity', 'entity_id', 'action', 'payload', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,225 @@
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import CampaignCustomer
+
+MAGIC = b'CMPC'
+FORMAT_VERSION = 1
+# magic, format version, snapshot version, customer count, target count
+HEADER = struct.Struct('=4sIQQQ')
+ITEM_SIZE = array('q').itemsize
+DEFAULT_CHECK_INTERVAL = 5
+DEFAULT_COMPILE_INTERVAL = 30
+DEFAULT_MAX_AGE = 120
+DEFAULT_FILE_MODE = 0o644
+
+
+class CatalogError(Exception):
+    pass
+
+
+def compile_catalog(path, now=None):
+    """
+    Write the targeting of campaigns that have not ended yet to `path` and return the snapshot version.
+
+    Layout after the header, all native int64:
+      customers[n]    sorted customer ids
+      offsets[n + 1]  start of each customer's slice in targets
+      targets[t]      campaign ids, sorted within each customer
+    """
+    now = now or timezone.now()
+    # Taken before reading so that anything committed while the rows are read counts as newer.
+    version = time.time_ns()
+    customers, offsets, targets = array('q'), array('q'), array('q')
+    rows = (CampaignCustomer.objects
+            .filter(campaign__end_date__gte=now)
+            .order_by('customer_id', 'campaign_id')
+            .values_list('customer_id', 'campaign_id'))
+    for customer_id, campaign_id in rows.iterator(chunk_size=10000):
+        if not customers or customers[-1] != customer_id:
+            customers.append(customer_id)
+            offsets.append(len(targets))
+        targets.append(campaign_id)
+    offsets.append(len(targets))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.catalog-')
+    try:
+        # mkstemp creates the file 0600; workers may run as another user than the compiler.
+        os.fchmod(fd, getattr(settings, 'CAMPAIGN_CATALOG_FILE_MODE', DEFAULT_FILE_MODE))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, version, len(customers), len(targets)))
+            customers.tofile(f)
+            offsets.tofile(f)
+            targets.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        # Readers keep mapping the old inode until they notice the rename.
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return version
+
+
+class CampaignCatalog:
+    """Read-only, zero-copy view of a compiled catalog file."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            stat = os.fstat(f.fileno())
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+
+        if len(self._mmap) < HEADER.size:
+            raise CatalogError(f'{path} is too short to be a campaign catalog')
+        magic, fmt, self.version, n_customers, n_targets = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise CatalogError(f'{path} is not a version {FORMAT_VERSION} campaign catalog')
+        if len(self._mmap) != HEADER.size + ITEM_SIZE * (2 * n_customers + 1 + n_targets):
+            raise CatalogError(f'{path} is truncated')
+
+        data = memoryview(self._mmap)[HEADER.size:].cast('q')
+        self._customers = data[:n_customers]
+        self._offsets = data[n_customers:2 * n_customers + 1]
+        self._targets = data[2 * n_customers + 1:]
+
+    def __len__(self):
+        return len(self._customers)
+
+    def targets(self, customer_id):
+        """Return the sorted campaign ids targeting the customer, or None if the snapshot has no targets for it."""
+        i = bisect_left(self._customers, customer_id)
+        if i == len(self._customers) or self._customers[i] != customer_id:
+            return None
+        return self._targets[self._offsets[i]:self._offsets[i + 1]]
+
+
+class CatalogReader:
+    """
+    Hands out the current CampaignCatalog for CAMPAIGN_CATALOG_PATH, remapping it when a new version is
+    renamed into place. Views taken from an older catalog stay valid until they are released.
+
+    A snapshot older than CAMPAIGN_CATALOG_MAX_AGE seconds is ignored, so a compiler that has stopped
+    leaves callers on their fresher fallback instead of serving its last snapshot indefinitely.
+
+    Targeting changes committed by this process after a snapshot was compiled are recorded with
+    mark_customers_changed / mark_campaign_changed, and targets() skips the snapshot for the customers
+    and campaigns they touch until a newer version is loaded.
+    """
+
+    def __init__(self, path=None, check_interval=None, max_age=None):
+        self._path = path
+        self._check_interval = check_interval
+        self._max_age = max_age
+        self._catalog = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        # customer or campaign id -> time.time_ns() of the last local change, comparable with versions
+        self._changed_customers = {}
+        self._changed_campaigns = {}
+
+    @property
+    def path(self):
+        return self._path or getattr(settings, 'CAMPAIGN_CATALOG_PATH', None)
+
+    @property
+    def check_interval(self):
+        if self._check_interval is not None:
+            return self._check_interval
+        return getattr(settings, 'CAMPAIGN_CATALOG_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL)
+
+    @property
+    def max_age(self):
+        if self._max_age is not None:
+            return self._max_age
+        return getattr(settings, 'CAMPAIGN_CATALOG_MAX_AGE', DEFAULT_MAX_AGE)
+
+    def current(self):
+        path = self.path
+        if not path:
+            return None
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            with self._lock:
+                if self._checked_at is None or now - self._checked_at >= self.check_interval:
+                    self._checked_at = now
+                    self._catalog = self._reload(path)
+                    self._forget_changes()
+        catalog = self._catalog
+        # Versions are the compiler's wall clock in nanoseconds.
+        if catalog is None or time.time_ns() - catalog.version > self.max_age * 1_000_000_000:
+            return None
+        return catalog
+
+    def targets(self, customer_id):
+        """
+        Return the customer's campaign ids from the current snapshot, or None when there is no usable
+        snapshot, it has no targets for the customer, or the snapshot predates a local change to them.
+        """
+        catalog = self.current()
+        if catalog is None:
+            return None
+        changed_at = self._changed_customers.get(customer_id)
+        if changed_at is not None and changed_at >= catalog.version:
+            return None
+        targeted_ids = catalog.targets(customer_id)
+        if targeted_ids is not None and self._changed_campaigns:
+            for campaign_id in targeted_ids:
+                changed_at = self._changed_campaigns.get(campaign_id)
+                if changed_at is not None and changed_at >= catalog.version:
+                    return None
+        return targeted_ids
+
+    def mark_customers_changed(self, customer_ids):
+        if self.path:
+            now = time.time_ns()
+            with self._lock:
+                for customer_id in customer_ids:
+                    self._changed_customers[customer_id] = now
+
+    def mark_campaign_changed(self, campaign_id):
+        if self.path:
+            with self._lock:
+                self._changed_campaigns[campaign_id] = time.time_ns()
+
+    def reset(self):
+        with self._lock:
+            self._catalog = None
+            self._checked_at = None
+            self._changed_customers = {}
+            self._changed_campaigns = {}
+
+    def _forget_changes(self):
+        # Changes older than the loaded snapshot are in it, and changes older than max_age predate any
+        # snapshot current() would still hand out.
+        cutoff = time.time_ns() - self.max_age * 1_000_000_000
+        if self._catalog is not None:
+            cutoff = max(cutoff, self._catalog.version)
+        for changed in (self._changed_customers, self._changed_campaigns):
+            for key in [key for key, changed_at in changed.items() if changed_at < cutoff]:
+                del changed[key]
+
+    def _reload(self, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if self._catalog is not None and self._catalog.identity == (stat.st_ino, stat.st_mtime_ns):
+            return self._catalog
+        try:
+            return CampaignCatalog(path)
+        except (OSError, CatalogError):
+            return self._catalog
+
+
+campaign_catalog = CatalogReader()
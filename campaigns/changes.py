@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.forms.models import model_to_dict
+from django.utils import timezone
+
+from .models import ChangeEvent
+
+DEFAULT_RETENTION_DAYS = 7
+# Key of the PostgreSQL advisory lock serializing outbox writers; the bytes spell "outbox".
+OUTBOX_LOCK_KEY = 0x6f7574626f78
+
+
+def lock_outbox():
+    """
+    Hold off other outbox writers until the current transaction ends, so ids are handed out in commit
+    order and a consumer that has read past an id never sees a lower one commit later. SQLite already
+    serializes write transactions, so only PostgreSQL needs the explicit lock.
+    """
+    connection = transaction.get_connection()
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [OUTBOX_LOCK_KEY])
+
+
+def campaign_payload(campaign):
+    return model_to_dict(campaign, exclude=['target_customers'])
+
+
+def record_campaign_change(campaign, action):
+    payload = campaign_payload(campaign) if action != 'deleted' else {'id': campaign.pk}
+    with transaction.atomic():
+        lock_outbox()
+        return ChangeEvent.objects.create(entity='campaign', entity_id=campaign.pk, action=action, payload=payload)
+
+
+def record_target_changes(pairs, action):
+    events = [
+        ChangeEvent(entity='campaign_customer', entity_id=campaign_id, action=action,
+                    payload={'campaign': campaign_id, 'customer': customer_id})
+        for campaign_id, customer_id in pairs
+    ]
+    with transaction.atomic():
+        lock_outbox()
+        ChangeEvent.objects.bulk_create(events)
+
+
+def record_usage(usage_log, discount_type, discount_applied):
+    with transaction.atomic():
+        lock_outbox()
+        return ChangeEvent.objects.create(
+            entity='usage',
+            entity_id=usage_log.pk,
+            action='applied',
+            payload={
+                'campaign': usage_log.campaign_id,
+                'customer': usage_log.customer_id,
+                'date': usage_log.date,
+                'usage_count': usage_log.usage_count,
+                'discount_type': discount_type,
+                'discount_applied': discount_applied,
+            },
+        )
+
+
+def changes_since(since):
+    return ChangeEvent.objects.filter(id__gt=since).order_by('id')
+
+
+def retention_cutoff(days=None):
+    """Events created before this have been kept long enough for feed consumers to have read them."""
+    if days is None:
+        days = getattr(settings, 'CAMPAIGN_CHANGES_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    return timezone.now() - timedelta(days=days)
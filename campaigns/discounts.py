@@ -0,0 +1,67 @@
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+CENT = Decimal('0.01')
+
+
+def parse_money(value):
+    """
+    Parse a non-negative amount into integer minor units. Amounts finer than a cent are rejected rather
+    than rounded, so 49.995 can never round up to meet a 50.00 threshold.
+    """
+    # Plain "123" / "123.4" / "123.45" strings and ints are exact in cents without going through Decimal.
+    if type(value) is int and value >= 0:
+        return value * 100
+    if type(value) is str:
+        whole, point, fraction = value.strip().partition('.')
+        if whole.isdecimal() and (not point or (fraction.isdecimal() and len(fraction) <= 2)):
+            return int(whole) * 100 + (int(fraction.ljust(2, '0')) if point else 0)
+    try:
+        amount = Decimal(str(value).strip())
+        if not amount.is_finite() or amount < 0:
+            raise ValueError
+        cents = amount.quantize(CENT)
+        if cents != amount:
+            raise ValueError
+        return int(cents.scaleb(2))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f'{value!r} is not a valid amount') from None
+
+
+@lru_cache(maxsize=4096)
+def scale_threshold(amount):
+    """parse_money for campaign amounts, which come from a small set of stored values."""
+    return parse_money(amount)
+
+
+def format_money(minor):
+    return Decimal(minor).scaleb(-2)
+
+
+class CampaignTerms:
+    """A campaign's discount type and amount with the amount pre-scaled to minor units."""
+    __slots__ = ('discount_type', 'amount')
+
+    def __init__(self, discount_type, amount):
+        self.discount_type = discount_type
+        self.amount = amount
+
+    @classmethod
+    def from_campaign(cls, campaign):
+        return cls(campaign.discount_type, scale_threshold(campaign.discount_amount))
+
+    def is_eligible(self, cart_total, delivery_fee):
+        if self.discount_type == 'cart':
+            return cart_total >= self.amount
+        if self.discount_type == 'delivery':
+            return delivery_fee >= self.amount
+        return False
+
+    def apply(self, cart_total, delivery_fee):
+        """Return (discount, new cart total, new delivery fee) in minor units."""
+        if self.discount_type == 'cart':
+            return self.amount, cart_total - self.amount, delivery_fee
+        if self.discount_type == 'delivery':
+            return self.amount, cart_total, delivery_fee - self.amount
+        return 0, cart_total, delivery_fee
+
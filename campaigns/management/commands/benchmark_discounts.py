@@ -0,0 +1,57 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from campaigns.discounts import CampaignTerms, parse_money
+
+
+class BenchCampaign:
+    __slots__ = ('discount_type', 'discount_amount')
+
+    def __init__(self, discount_type, discount_amount):
+        self.discount_type = discount_type
+        self.discount_amount = discount_amount
+
+
+class Command(BaseCommand):
+    help = 'Measure eligibility throughput of the discount kernel against a per-campaign Decimal scan.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaigns', type=int, default=20,
+                            help='Active targeted campaigns evaluated per request.')
+        parser.add_argument('--pool', type=int, default=500,
+                            help='Distinct campaigns requests draw from.')
+        parser.add_argument('--requests', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        pool = [
+            BenchCampaign(rng.choice(('cart', 'delivery')), Decimal(rng.randint(1, 100000)).scaleb(-2))
+            for _ in range(options['pool'])
+        ]
+        requests = [
+            (rng.sample(pool, min(options['campaigns'], len(pool))),
+             f'{rng.randint(0, 200000) / 100:.2f}', f'{rng.randint(0, 5000) / 100:.2f}')
+            for _ in range(options['requests'])
+        ]
+
+        started = time.perf_counter()
+        for campaigns, cart_total, delivery_fee in requests:
+            cart_total, delivery_fee = Decimal(cart_total), Decimal(delivery_fee)
+            [c for c in campaigns
+             if (cart_total if c.discount_type == 'cart' else delivery_fee) >= c.discount_amount]
+        self.report('decimal scan', started, len(requests))
+
+        # What AvailableCampaignAPIView does: parse the request once, then compare cents per campaign.
+        started = time.perf_counter()
+        for campaigns, cart_total, delivery_fee in requests:
+            cart_total, delivery_fee = parse_money(cart_total), parse_money(delivery_fee)
+            [c for c in campaigns if CampaignTerms.from_campaign(c).is_eligible(cart_total, delivery_fee)]
+        self.report('integer scan', started, len(requests))
+
+    def report(self, label, started, requests):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'{label:>30}: {requests / elapsed:12,.0f} requests/s ({elapsed:.3f}s)')
@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from campaigns.catalog import compile_catalog, DEFAULT_COMPILE_INTERVAL, DEFAULT_MAX_AGE
+
+
+class Command(BaseCommand):
+    help = 'Keep rewriting the campaign targeting snapshot that workers mmap from CAMPAIGN_CATALOG_PATH.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Catalog file to write. Defaults to CAMPAIGN_CATALOG_PATH.')
+        parser.add_argument('--interval', type=float,
+                            help='Seconds between compiles. Defaults to CAMPAIGN_CATALOG_COMPILE_INTERVAL.')
+        parser.add_argument('--once', action='store_true',
+                            help='Compile a single snapshot and exit. Workers ignore it once it is older '
+                                 'than CAMPAIGN_CATALOG_MAX_AGE.')
+
+    def handle(self, *args, **options):
+        path = options['output'] or getattr(settings, 'CAMPAIGN_CATALOG_PATH', None)
+        if not path:
+            raise CommandError('Pass --output or set CAMPAIGN_CATALOG_PATH.')
+        interval = options['interval']
+        if interval is None:
+            interval = getattr(settings, 'CAMPAIGN_CATALOG_COMPILE_INTERVAL', DEFAULT_COMPILE_INTERVAL)
+        max_age = getattr(settings, 'CAMPAIGN_CATALOG_MAX_AGE', DEFAULT_MAX_AGE)
+        if not options['once'] and not 0 < interval < max_age:
+            raise CommandError(f'--interval must be positive and below CAMPAIGN_CATALOG_MAX_AGE ({max_age}s), '
+                               'or workers will drop the snapshot between compiles.')
+
+        while True:
+            version = compile_catalog(path)
+            self.stdout.write(f'Wrote campaign catalog version {version} to {path}')
+            if options['once']:
+                return
+            time.sleep(interval)
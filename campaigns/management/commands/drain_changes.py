@@ -0,0 +1,40 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from campaigns.changes import changes_since, retention_cutoff
+from campaigns.models import ChangeEvent
+from campaigns.serializers import ChangeEventSerializer
+
+
+class Command(BaseCommand):
+    help = 'Write change events after a cursor to stdout as JSON lines, one batch at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=int, default=0, help='Only emit events with a larger id.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--delete', action='store_true',
+                            help='Delete written events that are older than the retention period.')
+        parser.add_argument('--retention-days', type=float, default=None,
+                            help='Days events are kept for /api/changes consumers before --delete removes them '
+                                 '(default CAMPAIGN_CHANGES_RETENTION_DAYS).')
+
+    def handle(self, *args, **options):
+        cursor = options['since']
+        cutoff = retention_cutoff(options['retention_days'])
+        while True:
+            with transaction.atomic():
+                batch = list(changes_since(cursor)[:options['batch_size']])
+                if not batch:
+                    break
+                for event in ChangeEventSerializer(batch, many=True).data:
+                    self.stdout.write(json.dumps(event, default=str))
+                self.stdout.flush()
+                cursor = batch[-1].id
+                if options['delete']:
+                    # Newer events stay for feed consumers that have not caught up yet.
+                    ChangeEvent.objects.filter(
+                        id__in=[event.id for event in batch], created_at__lt=cutoff
+                    ).delete()
+        self.stderr.write(f'Drained through cursor {cursor}')
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-19 18:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0003_changeevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='campaignusagelog',
+            index=models.Index(fields=['date', 'id'], name='campaigns_usage_date_id_idx'),
+        ),
+    ]
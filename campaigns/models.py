@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 
@@ -6,6 +7,19 @@ DISCOUNT_TYPE_CHOICES = [
     ('delivery', 'Delivery'),
 ]
 
+CHANGE_ENTITY_CHOICES = [
+    ('campaign', 'Campaign'),
+    ('campaign_customer', 'Campaign Customer'),
+    ('usage', 'Usage'),
+]
+
+CHANGE_ACTION_CHOICES = [
+    ('created', 'Created'),
+    ('updated', 'Updated'),
+    ('deleted', 'Deleted'),
+    ('applied', 'Applied'),
+]
+
 
 class Customer(models.Model):
     email = models.EmailField(unique=True)
@@ -51,4 +65,18 @@ class CampaignUsageLog(models.Model):
 
     class Meta:
         unique_together = ('campaign', 'customer', 'date')
-
+        indexes = [
+            models.Index(fields=['date', 'id'], name='campaigns_usage_date_id_idx'),
+        ]
+
+
+class ChangeEvent(models.Model):
+    """
+    Outbox row written in the same transaction as the change it describes. The id is the feed cursor.
+    campaign_customer events use the campaign id as entity_id and carry the customer in the payload.
+    """
+    entity = models.CharField(max_length=30, choices=CHANGE_ENTITY_CHOICES)
+    entity_id = models.BigIntegerField()
+    action = models.CharField(max_length=20, choices=CHANGE_ACTION_CHOICES)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Campaign, Customer, CampaignCustomer, CampaignUsageLog
+from .models import Campaign, Customer, CampaignCustomer, CampaignUsageLog, ChangeEvent
 
 
 class CustomerSerializer(serializers.ModelSerializer):
@@ -29,3 +29,9 @@ class CampaignUsageLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = CampaignUsageLog
         fields = '__all__'
+
+
+class ChangeEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChangeEvent
+        fields = '__all__'
@@ -0,0 +1,137 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .catalog import campaign_catalog
+from .changes import record_campaign_change, record_target_changes
+from .models import Campaign, Customer, CampaignCustomer
+from .targeting import targeting_index
+
+
+@receiver(pre_save, sender=CampaignCustomer)
+def campaign_customer_saving(sender, instance, **kwargs):
+    # Remember the stored pair so post_save receivers can tell when a row was re-pointed.
+    instance._previous_pair = None
+    if instance.pk is not None:
+        instance._previous_pair = (CampaignCustomer.objects
+                                   .filter(pk=instance.pk)
+                                   .values_list('campaign_id', 'customer_id')
+                                   .first())
+
+
+@receiver(post_save, sender=CampaignCustomer)
+def campaign_customer_saved(sender, instance, created, **kwargs):
+    customer_id, campaign_id = instance.customer_id, instance.campaign_id
+    previous = getattr(instance, '_previous_pair', None)
+    if created:
+        def add():
+            targeting_index.add(customer_id, campaign_id)
+            campaign_catalog.mark_customers_changed([customer_id])
+
+        transaction.on_commit(add)
+    elif previous is not None and previous != (campaign_id, customer_id):
+        previous_campaign_id, previous_customer_id = previous
+
+        def repoint():
+            targeting_index.remove(previous_customer_id, previous_campaign_id)
+            targeting_index.add(customer_id, campaign_id)
+            campaign_catalog.mark_customers_changed([previous_customer_id, customer_id])
+
+        transaction.on_commit(repoint)
+
+
+@receiver(post_delete, sender=CampaignCustomer)
+def campaign_customer_deleted(sender, instance, **kwargs):
+    customer_id, campaign_id = instance.customer_id, instance.campaign_id
+
+    def remove():
+        targeting_index.remove(customer_id, campaign_id)
+        campaign_catalog.mark_customers_changed([customer_id])
+
+    transaction.on_commit(remove)
+
+
+@receiver(post_delete, sender=Customer)
+def customer_deleted(sender, instance, **kwargs):
+    customer_id = instance.pk
+
+    def evict():
+        targeting_index.evict(customer_id)
+        campaign_catalog.mark_customers_changed([customer_id])
+
+    transaction.on_commit(evict)
+
+
+@receiver(m2m_changed, sender=CampaignCustomer)
+def campaign_targets_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove'):
+        update = targeting_index.add if action == 'post_add' else targeting_index.remove
+        if reverse:
+            pairs = [(instance.pk, campaign_id) for campaign_id in pk_set]
+        else:
+            pairs = [(customer_id, instance.pk) for customer_id in pk_set]
+
+        def apply():
+            for customer_id, campaign_id in pairs:
+                update(customer_id, campaign_id)
+            campaign_catalog.mark_customers_changed([customer_id for customer_id, _ in pairs])
+
+        transaction.on_commit(apply)
+    elif action == 'post_clear':
+        if reverse:
+            customer_id = instance.pk
+
+            def evict():
+                targeting_index.evict(customer_id)
+                campaign_catalog.mark_customers_changed([customer_id])
+
+            transaction.on_commit(evict)
+        else:
+            campaign_id = instance.pk
+
+            def remove_campaign():
+                targeting_index.remove_campaign(campaign_id)
+                # clear() does not name the customers, so skip the snapshot for anyone it lists the campaign for.
+                campaign_catalog.mark_campaign_changed(campaign_id)
+
+            transaction.on_commit(remove_campaign)
+
+
+@receiver(post_save, sender=Campaign)
+def campaign_saved(sender, instance, created, **kwargs):
+    record_campaign_change(instance, 'created' if created else 'updated')
+
+
+@receiver(post_delete, sender=Campaign)
+def campaign_deleted(sender, instance, **kwargs):
+    record_campaign_change(instance, 'deleted')
+
+
+@receiver(post_save, sender=CampaignCustomer)
+def record_campaign_customer_saved(sender, instance, created, **kwargs):
+    pair = (instance.campaign_id, instance.customer_id)
+    previous = getattr(instance, '_previous_pair', None)
+    if created:
+        record_target_changes([pair], 'created')
+    elif previous is not None and previous != pair:
+        record_target_changes([previous], 'deleted')
+        record_target_changes([pair], 'created')
+
+
+@receiver(post_delete, sender=CampaignCustomer)
+def record_campaign_customer_deleted(sender, instance, **kwargs):
+    record_target_changes([(instance.campaign_id, instance.customer_id)], 'deleted')
+
+
+@receiver(m2m_changed, sender=CampaignCustomer)
+def record_campaign_targets_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove'):
+        if reverse:
+            pairs = [(campaign_id, instance.pk) for campaign_id in pk_set]
+        else:
+            pairs = [(instance.pk, customer_id) for customer_id in pk_set]
+        record_target_changes(pairs, 'created' if action == 'post_add' else 'deleted')
+    elif action == 'pre_clear':
+        # clear() deletes in bulk without naming the rows, so record them before they go.
+        rows = CampaignCustomer.objects.filter(**{'customer' if reverse else 'campaign': instance})
+        record_target_changes(rows.values_list('campaign_id', 'customer_id'), 'deleted')
@@ -0,0 +1,179 @@
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .models import Customer, CampaignCustomer
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+DEFAULT_CACHE_TTL = 60
+
+# Hash table slot plus OrderedDict node per key. Traced with tracemalloc on CPython 3.11 this runs from
+# about 75 bytes per entry just before a resize to about 115 just after one, so the budget takes the top of
+# that range; test_entry_size_matches_traced_memory keeps it honest.
+MAPPING_OVERHEAD = 112
+# Key int, (expires_at, ids) tuple, expires_at float and mapping bookkeeping stored per customer.
+ENTRY_OVERHEAD = sys.getsizeof(2 ** 40) + sys.getsizeof((0.0, None)) + sys.getsizeof(0.0) + MAPPING_OVERHEAD
+
+
+def contains(ids, campaign_id):
+    i = bisect_left(ids, campaign_id)
+    return i < len(ids) and ids[i] == campaign_id
+
+
+class TargetingIndex:
+    """
+    Per-process LRU cache of customer id -> sorted array('q') of targeted campaign ids.
+
+    Entries are kept up to date from CampaignCustomer signals in this process and
+    expire after a TTL, which bounds staleness for writes made by other workers.
+    """
+
+    def __init__(self, max_bytes=None, ttl=None):
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        # customer id -> [loads in flight, changed since they started]
+        self._loads = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_bytes(self):
+        if self._max_bytes is not None:
+            return self._max_bytes
+        return getattr(settings, 'CAMPAIGN_TARGETING_CACHE_BYTES', DEFAULT_CACHE_BYTES)
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'CAMPAIGN_TARGETING_CACHE_TTL', DEFAULT_CACHE_TTL)
+
+    def get(self, customer_id):
+        """Return the sorted campaign ids targeting the customer, or None if the customer does not exist."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(customer_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(customer_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            load = self._loads.setdefault(customer_id, [0, False])
+            load[0] += 1
+
+        ids = None
+        try:
+            ids = self._load(customer_id)
+        finally:
+            with self._lock:
+                load[0] -= 1
+                if not load[0]:
+                    del self._loads[customer_id]
+                # A change committed during the read may be missing from it, and an entry stored by another
+                # reader in the meantime is at least as fresh, so only a clean read replaces a missing or
+                # expired entry.
+                current = self._entries.get(customer_id)
+                if ids is not None and not load[1] and (current is None or current[0] <= now):
+                    self._store(customer_id, ids, now + self.ttl)
+        return ids
+
+    def _load(self, customer_id):
+        ids = array('q', sorted(
+            CampaignCustomer.objects.filter(customer_id=customer_id).values_list('campaign_id', flat=True)
+        ))
+        if not ids and not Customer.objects.filter(pk=customer_id).exists():
+            return None
+        return ids
+
+    def add(self, customer_id, campaign_id):
+        with self._lock:
+            self._mark_changed(customer_id)
+            entry = self._entries.get(customer_id)
+            if entry is None or contains(entry[1], campaign_id):
+                return
+            ids = array('q', entry[1])
+            insort(ids, campaign_id)
+            self._store(customer_id, ids, entry[0])
+
+    def remove(self, customer_id, campaign_id):
+        with self._lock:
+            self._mark_changed(customer_id)
+            entry = self._entries.get(customer_id)
+            if entry is None or not contains(entry[1], campaign_id):
+                return
+            ids = array('q', entry[1])
+            ids.pop(bisect_left(ids, campaign_id))
+            self._store(customer_id, ids, entry[0])
+
+    def remove_campaign(self, campaign_id):
+        with self._lock:
+            self._mark_changed()
+            for customer_id in [c for c, (_, ids) in self._entries.items() if contains(ids, campaign_id)]:
+                expires_at, ids = self._entries[customer_id]
+                ids = array('q', ids)
+                ids.pop(bisect_left(ids, campaign_id))
+                self._store(customer_id, ids, expires_at)
+
+    def evict(self, customer_id):
+        with self._lock:
+            self._mark_changed(customer_id)
+            entry = self._entries.pop(customer_id, None)
+            if entry is not None:
+                self._bytes -= self._entry_size(entry[1])
+
+    def clear(self):
+        with self._lock:
+            self._mark_changed()
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            customers = len(self._entries)
+            nbytes = self._bytes
+        return {
+            'customers': customers,
+            'bytes': nbytes,
+            'max_bytes': self.max_bytes,
+            'bytes_per_million_customers': nbytes * 1_000_000 // customers if customers else 0,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def _mark_changed(self, customer_id=None):
+        loads = self._loads.values() if customer_id is None else [self._loads.get(customer_id)]
+        for load in loads:
+            if load is not None:
+                load[1] = True
+
+    @staticmethod
+    def _entry_size(ids):
+        return sys.getsizeof(ids) + ENTRY_OVERHEAD
+
+    def _store(self, customer_id, ids, expires_at):
+        # Arrays are replaced rather than mutated so callers holding a previous result are unaffected.
+        old = self._entries.pop(customer_id, None)
+        if old is not None:
+            self._bytes -= self._entry_size(old[1])
+        size = self._entry_size(ids)
+        if size > self.max_bytes:
+            return
+        self._entries[customer_id] = (expires_at, ids)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= self._entry_size(evicted)
+            self.evictions += 1
+
+
+targeting_index = TargetingIndex()
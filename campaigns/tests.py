@@ -2,13 +2,34 @@ from django.utils import timezone
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Campaign, Customer, CampaignUsageLog
+from .models import Campaign, Customer, CampaignCustomer, CampaignUsageLog, ChangeEvent
+from .admin import EstimatedCountPaginator
+from .discounts import CampaignTerms, parse_money, format_money, scale_threshold
+from .catalog import compile_catalog, CampaignCatalog, CatalogReader, CatalogError
+from .targeting import targeting_index, TargetingIndex, MAPPING_OVERHEAD
+from array import array
 from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+import json
+import os
+import random
+import time
+import tracemalloc
+from collections import OrderedDict
+import tempfile
 
 
 class CampaignTests(APITestCase):
 
     def setUp(self):
+        targeting_index.clear()
         self.customer1 = Customer.objects.create(name="Alice", email="alice@example.com")
         self.customer2 = Customer.objects.create(name="Bob", email="bob@example.com")
 
@@ -156,4 +177,545 @@ class CampaignTests(APITestCase):
         )
         self.assertTrue(is_valid)
 
+    def test_available_campaign_for_unknown_customer(self):
+        url = reverse('campaign-available')
+        for customer_id in (9999, 0, -1, 2 ** 63, 99999999999999999999):
+            response = self.client.get(url, {'customer_id': customer_id, 'cart_total': 200})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, customer_id)
+
+
+class TargetingIndexTests(APITestCase):
+
+    def setUp(self):
+        targeting_index.clear()
+        self.customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        self.campaigns = [
+            Campaign.objects.create(
+                name=f"Campaign {i}",
+                discount_type="cart",
+                discount_amount=10,
+                start_date=timezone.now() - timedelta(days=1),
+                end_date=timezone.now() + timedelta(days=1),
+                budget=100,
+                usage_limit_per_customer_per_day=1
+            )
+            for i in range(3)
+        ]
+
+    def test_available_campaigns_served_from_index(self):
+        self.campaigns[0].target_customers.set([self.customer])
+        url = reverse('campaign-available')
+        params = {'customer_id': self.customer.id, 'cart_total': 200}
+        self.client.get(url, params)
+
+        # Warm index: targeted active campaigns, then usage log and serialized targets per matching campaign.
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(len(queries), 3)
+        self.assertIn(f'"campaigns_campaign"."id" IN ({self.campaigns[0].id})', queries[0]['sql'])
+        self.assertEqual([c['id'] for c in response.data], [self.campaigns[0].id])
+
+    def test_index_follows_target_changes(self):
+        self.assertEqual(list(targeting_index.get(self.customer.id)), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.campaigns[2].target_customers.add(self.customer)
+            CampaignCustomer.objects.create(campaign=self.campaigns[0], customer=self.customer)
+        with self.assertNumQueries(0):
+            ids = targeting_index.get(self.customer.id)
+        self.assertEqual(list(ids), [self.campaigns[0].id, self.campaigns[2].id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.campaigns[2].target_customers.remove(self.customer)
+            self.campaigns[0].delete()
+        self.assertEqual(list(targeting_index.get(self.customer.id)), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.customer.delete()
+        self.assertIsNone(targeting_index.get(self.customer.id))
+
+    def test_entry_size_matches_traced_memory(self):
+        # Keys and values are built first, so only the hash table and OrderedDict bookkeeping is traced;
+        # the objects themselves are counted exactly by sys.getsizeof. Per-entry cost depends on how full
+        # the table is, so sample sizes spanning a resize and check the constant covers the worst of them.
+        per_entry = []
+        for entries in range(40000, 72001, 4000):
+            items = [(2 ** 40 + i, (1.0, None)) for i in range(entries)]
+            tracemalloc.start()
+            try:
+                before = tracemalloc.get_traced_memory()[0]
+                mapping = OrderedDict()
+                for key, value in items:
+                    mapping[key] = value
+                per_entry.append((tracemalloc.get_traced_memory()[0] - before) / entries)
+            finally:
+                tracemalloc.stop()
+        self.assertLessEqual(max(per_entry), MAPPING_OVERHEAD * 1.05)
+        self.assertGreaterEqual(max(per_entry), MAPPING_OVERHEAD * 0.85)
+
+    def test_index_does_not_cache_read_overtaken_by_change(self):
+        index = TargetingIndex(ttl=60)
+        load = index._load
+
+        def load_then_commit_concurrently(customer_id):
+            ids = load(customer_id)
+            CampaignCustomer.objects.create(campaign=self.campaigns[1], customer=self.customer)
+            index.add(customer_id, self.campaigns[1].id)
+            return ids
+
+        with mock.patch.object(index, '_load', load_then_commit_concurrently):
+            self.assertEqual(list(index.get(self.customer.id)), [])
+        self.assertEqual(index.stats()['customers'], 0)
+        self.assertEqual(list(index.get(self.customer.id)), [self.campaigns[1].id])
+        self.assertEqual(index.stats()['customers'], 1)
+
+    def test_index_evicts_least_recently_used_over_budget(self):
+        other = Customer.objects.create(name="Bob", email="bob@example.com")
+        index = TargetingIndex(max_bytes=1, ttl=60)
+        index.get(self.customer.id)
+        self.assertEqual(index.stats()['customers'], 0)
+
+        index = TargetingIndex(max_bytes=TargetingIndex._entry_size(array('q')), ttl=60)
+        index.get(self.customer.id)
+        index.get(other.id)
+        stats = index.stats()
+        self.assertEqual(stats['customers'], 1)
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['bytes_per_million_customers'], stats['bytes'] * 1_000_000)
+        with self.assertNumQueries(0):
+            index.get(other.id)
+
+
+class CampaignCatalogTests(APITestCase):
+
+    def setUp(self):
+        targeting_index.clear()
+        self.customers = [
+            Customer.objects.create(name=name, email=f"{name.lower()}@example.com")
+            for name in ("Alice", "Bob", "Carol")
+        ]
+        self.campaigns = [
+            Campaign.objects.create(
+                name=f"Campaign {i}",
+                discount_type="cart",
+                discount_amount=10,
+                start_date=timezone.now() - timedelta(days=2),
+                end_date=timezone.now() + timedelta(days=1 if i < 2 else -1),
+                budget=100,
+                usage_limit_per_customer_per_day=1
+            )
+            for i in range(3)
+        ]
+        self.campaigns[1].target_customers.set(self.customers[:2])
+        self.campaigns[0].target_customers.set([self.customers[0]])
+        self.campaigns[2].target_customers.set([self.customers[2]])
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'catalog.bin')
+
+    def test_compile_and_lookup(self):
+        version = compile_catalog(self.path)
+        catalog = CampaignCatalog(self.path)
+        self.assertEqual(catalog.version, version)
+        self.assertEqual(len(catalog), 2)
+        self.assertEqual(list(catalog.targets(self.customers[0].id)),
+                         [self.campaigns[0].id, self.campaigns[1].id])
+        self.assertEqual(list(catalog.targets(self.customers[1].id)), [self.campaigns[1].id])
+        # Only targets of campaign 2 which has already ended.
+        self.assertIsNone(catalog.targets(self.customers[2].id))
+        self.assertIsNone(catalog.targets(9999))
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o644)
+
+    def test_rejects_corrupt_file(self):
+        compile_catalog(self.path)
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 8)
+        with self.assertRaises(CatalogError):
+            CampaignCatalog(self.path)
+
+    def test_reader_swaps_to_new_version(self):
+        reader = CatalogReader(self.path, check_interval=0)
+        self.assertIsNone(reader.current())
+
+        compile_catalog(self.path)
+        first = reader.current()
+        held = first.targets(self.customers[0].id)
+        self.assertIs(reader.current(), first)
+
+        CampaignCustomer.objects.filter(customer=self.customers[0]).delete()
+        compile_catalog(self.path)
+        second = reader.current()
+        self.assertGreater(second.version, first.version)
+        self.assertIsNone(second.targets(self.customers[0].id))
+        self.assertEqual(list(held), [self.campaigns[0].id, self.campaigns[1].id])
+
+    def test_reader_ignores_stale_snapshot(self):
+        version = compile_catalog(self.path)
+        reader = CatalogReader(self.path, check_interval=60, max_age=120)
+        self.assertIsNotNone(reader.current())
+        with mock.patch('campaigns.catalog.time.time_ns', return_value=version + 121 * 10 ** 9):
+            self.assertIsNone(reader.current())
+
+    def test_compile_command(self):
+        out = StringIO()
+        call_command('compile_campaign_catalog', '--output', self.path, '--once', stdout=out)
+        self.assertEqual(CampaignCatalog(self.path).version, int(out.getvalue().split()[4]))
+        with self.assertRaises(CommandError):
+            call_command('compile_campaign_catalog', '--output', self.path, '--interval', '600')
+
+    def test_available_campaigns_served_from_catalog(self):
+        compile_catalog(self.path)
+        url = reverse('campaign-available')
+        with mock.patch('campaigns.views.campaign_catalog', CatalogReader(self.path, check_interval=60)):
+            # Active campaigns, then usage log and serialized targets for each of the two matches.
+            with self.assertNumQueries(5):
+                response = self.client.get(url, {'customer_id': self.customers[0].id, 'cart_total': 200})
+        self.assertEqual(sorted(c['id'] for c in response.data), [self.campaigns[0].id, self.campaigns[1].id])
+
+    def test_local_changes_override_snapshot(self):
+        alice, bob, carol = self.customers
+        self.campaigns[1].target_customers.add(carol)
+        compile_catalog(self.path)
+        reader = CatalogReader(self.path, check_interval=60)
+        url = reverse('campaign-available')
+        with mock.patch('campaigns.views.campaign_catalog', reader), \
+                mock.patch('campaigns.signals.campaign_catalog', reader):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.campaigns[0].target_customers.remove(alice)
+            response = self.client.get(url, {'customer_id': alice.id, 'cart_total': 200})
+            self.assertEqual([c['id'] for c in response.data], [self.campaigns[1].id])
+
+            bob_id = bob.id
+            with self.captureOnCommitCallbacks(execute=True):
+                bob.delete()
+            response = self.client.get(url, {'customer_id': bob_id, 'cart_total': 200})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.campaigns[1].target_customers.clear()
+            self.assertIsNone(reader.targets(carol.id))
+            self.assertEqual(self.client.get(url, {'customer_id': carol.id, 'cart_total': 200}).data, [])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.campaigns[0].target_customers.add(alice)
+            self.assertIsNone(reader.targets(alice.id))
+            # A snapshot compiled after the changes is trusted again.
+            compile_catalog(self.path)
+            reader._checked_at = None
+            self.assertEqual(list(reader.targets(alice.id)), [self.campaigns[0].id])
+
+
+class ChangeFeedTests(APITestCase):
+
+    def setUp(self):
+        self.customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        self.campaign = Campaign.objects.create(
+            name="Cart Discount",
+            discount_type="cart",
+            discount_amount=50,
+            start_date=timezone.now() - timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=1),
+            budget=500,
+            usage_limit_per_customer_per_day=2
+        )
+        self.campaign.target_customers.set([self.customer])
+
+    def feed(self, **params):
+        response = self.client.get(reverse('change-feed'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_feed_records_campaign_target_and_usage_changes(self):
+        data = self.feed()
+        self.assertEqual([(c['entity'], c['action']) for c in data['changes']],
+                         [('campaign', 'created'), ('campaign_customer', 'created')])
+        self.assertEqual(data['changes'][1]['payload'], {'campaign': self.campaign.id, 'customer': self.customer.id})
+
+        url = reverse('apply-discount', args=[self.campaign.id])
+        self.client.post(url, {'customer_id': self.customer.id, 'cart_total': 200, 'delivery_fee': 20}, format='json')
+        self.client.delete(reverse('campaign-detail', args=[self.campaign.id]))
+
+        data = self.feed(since=data['next'])
+        self.assertEqual([(c['entity'], c['action']) for c in data['changes']], [
+            ('campaign', 'updated'),
+            ('usage', 'applied'),
+            ('campaign_customer', 'deleted'),
+            ('campaign', 'deleted'),
+        ])
+        self.assertEqual(data['changes'][0]['payload']['total_spent'], '50.00')
+        self.assertEqual(data['changes'][1]['payload']['usage_count'], 1)
+        self.assertEqual(self.feed(since=data['next']), {'changes': [], 'next': data['next']})
+
+    def test_feed_records_repointed_target(self):
+        other = Customer.objects.create(name="Bob", email="bob@example.com")
+        cursor = self.feed()['next']
+        targeting_index.clear()
+        self.assertEqual(list(targeting_index.get(self.customer.id)), [self.campaign.id])
+
+        row = CampaignCustomer.objects.get()
+        row.customer = other
+        with self.captureOnCommitCallbacks(execute=True):
+            row.save()
+
+        changes = self.feed(since=cursor)['changes']
+        self.assertEqual([(c['action'], c['payload']) for c in changes], [
+            ('deleted', {'campaign': self.campaign.id, 'customer': self.customer.id}),
+            ('created', {'campaign': self.campaign.id, 'customer': other.id}),
+        ])
+        self.assertEqual(list(targeting_index.get(self.customer.id)), [])
+
+        cursor = changes[-1]['id']
+        row.save()
+        self.assertEqual(self.feed(since=cursor)['changes'], [])
+
+    def test_feed_pages_by_cursor(self):
+        first = self.feed(limit=1)
+        self.assertEqual(len(first['changes']), 1)
+        second = self.feed(since=first['next'], limit=1)
+        self.assertEqual(second['changes'][0]['id'], ChangeEvent.objects.order_by('id').last().id)
+
+    def test_feed_rejects_bad_cursor(self):
+        for params in ({'since': 'abc'}, {'since': 2 ** 63}, {'since': -1}, {'wait': 'nan'}, {'wait': 'inf'},
+                       {'wait': -1}, {'limit': 0}):
+            response = self.client.get(reverse('change-feed'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_drain_command(self):
+        out, err = StringIO(), StringIO()
+        call_command('drain_changes', '--batch-size', '1', '--delete', stdout=out, stderr=err)
+        events = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([e['entity'] for e in events], ['campaign', 'campaign_customer'])
+        self.assertIn(f'cursor {events[-1]["id"]}', err.getvalue())
+        self.assertEqual(ChangeEvent.objects.count(), 2)
+
+    def test_drain_command_deletes_only_events_past_retention(self):
+        old = ChangeEvent.objects.order_by('id').first()
+        ChangeEvent.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=8))
+        call_command('drain_changes', '--delete', stdout=StringIO(), stderr=StringIO())
+        self.assertFalse(ChangeEvent.objects.filter(pk=old.pk).exists())
+        self.assertEqual(ChangeEvent.objects.count(), 1)
+
+        call_command('drain_changes', '--delete', '--retention-days', '0', stdout=StringIO(), stderr=StringIO())
+        self.assertFalse(ChangeEvent.objects.exists())
+
+
+class AdminTests(APITestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.campaign = Campaign.objects.create(
+            name="Cart Discount",
+            discount_type="cart",
+            discount_amount=50,
+            start_date=timezone.now() - timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=1),
+            budget=500,
+            usage_limit_per_customer_per_day=2
+        )
+
+    def add_customers(self, count):
+        start = Customer.objects.count()
+        customers = Customer.objects.bulk_create([
+            Customer(name=f"Customer {i}", email=f"customer{i}@example.com") for i in range(start, start + count)
+        ])
+        CampaignCustomer.objects.bulk_create([
+            CampaignCustomer(campaign=self.campaign, customer=customer) for customer in customers
+        ])
+        CampaignUsageLog.objects.bulk_create([
+            CampaignUsageLog(campaign=self.campaign, customer=customer, usage_count=1) for customer in customers
+        ])
+
+    def test_usage_log_changelist_queries_do_not_grow_with_rows(self):
+        url = reverse('admin:campaigns_campaignusagelog_changelist')
+        self.add_customers(5)
+        # Session, user, result count, rows with related objects and two date hierarchy queries.
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.add_customers(150)
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['cl'].result_list), 100)
+
+    def test_campaign_change_form_pages_targets(self):
+        url = reverse('admin:campaigns_campaign_change', args=[self.campaign.id])
+        self.add_customers(5)
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('target_customers', response.context['adminform'].form.fields)
+
+        self.add_customers(120)
+        with self.assertNumQueries(6):
+            response = self.client.get(url, {'targets_page': 3})
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertEqual(len(formset.forms), 25)
+        self.assertContains(response, 'Page 3 of 3 (125 targets)')
+
+        filters = '_changelist_filters=discount_type%3Dcart'
+        response = self.client.get(f'{url}?{filters}&targets_page=2')
+        self.assertContains(response, f'href="?{filters}&amp;targets_page=1"')
+        self.assertContains(response, f'href="?{filters}&amp;targets_page=3"')
+
+    def test_campaign_change_form_adds_and_removes_targets(self):
+        self.add_customers(2)
+        existing, kept = CampaignCustomer.objects.order_by('id')
+        new = Customer.objects.create(name="Zed", email="zed@example.com")
+        url = reverse('admin:campaigns_campaign_change', args=[self.campaign.id])
+        data = {
+            'name': self.campaign.name,
+            'discount_type': 'cart',
+            'discount_amount': '50',
+            'start_date_0': '2025-01-01', 'start_date_1': '00:00:00',
+            'end_date_0': '2099-01-01', 'end_date_1': '00:00:00',
+            'budget': '500',
+            'usage_limit_per_customer_per_day': '2',
+            'total_spent': '0',
+            'campaigncustomer_set-TOTAL_FORMS': '2',
+            'campaigncustomer_set-INITIAL_FORMS': '2',
+            'campaigncustomer_set-0-id': str(existing.id),
+            'campaigncustomer_set-0-campaign': str(self.campaign.id),
+            'campaigncustomer_set-0-DELETE': 'on',
+            'campaigncustomer_set-1-id': str(kept.id),
+            'campaigncustomer_set-1-campaign': str(self.campaign.id),
+            'campaigncustomer_set-2-TOTAL_FORMS': '1',
+            'campaigncustomer_set-2-INITIAL_FORMS': '0',
+            'campaigncustomer_set-2-0-customer': str(new.id),
+            'campaigncustomer_set-2-0-campaign': str(self.campaign.id),
+        }
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(
+            set(self.campaign.target_customers.values_list('id', flat=True)),
+            {kept.customer_id, new.id}
+        )
+
+    def test_change_events_are_read_only(self):
+        event = ChangeEvent.objects.order_by('id').first()
+        url = reverse('admin:campaigns_changeevent_change', args=[event.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotContains(response, 'name="payload"')
+
+        response = self.client.post(url, {'entity': 'usage', 'entity_id': 1, 'action': 'applied', 'payload': '{}'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        for name in ('add', 'delete'):
+            args = [] if name == 'add' else [event.id]
+            response = self.client.get(reverse(f'admin:campaigns_changeevent_{name}', args=args))
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        event.refresh_from_db()
+        self.assertEqual(event.entity, 'campaign')
+
+    def test_estimated_count_paginator(self):
+        queryset = CampaignUsageLog.objects.order_by('id')
+        self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 0)
+        with mock.patch.object(EstimatedCountPaginator, '_estimated_count', return_value=5000000):
+            self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 5000000)
+            self.assertEqual(EstimatedCountPaginator(queryset.filter(usage_count=1), 10).count, 0)
+
+
+class DiscountKernelTests(SimpleTestCase):
+    """Randomised properties checked against plain Decimal arithmetic on the same inputs."""
+
+    def setUp(self):
+        self.rng = random.Random(20250501)
+
+    def random_amount(self, high=100000):
+        return Decimal(self.rng.randint(0, high)).scaleb(-2)
+
+    def test_parse_money(self):
+        for _ in range(1000):
+            amount = Decimal(self.rng.randint(0, 10 ** 9)).scaleb(-self.rng.randint(0, 4))
+            for value in (amount, str(amount)):
+                if amount == amount.quantize(Decimal('0.01')):
+                    self.assertEqual(format_money(parse_money(value)), amount)
+                else:
+                    with self.assertRaises(ValueError):
+                        parse_money(value)
+        self.assertEqual(parse_money(0.1), 10)
+        self.assertEqual(parse_money(200), 20000)
+        self.assertEqual(parse_money(' 10.050 '), 1005)
+        self.assertEqual(parse_money('10.5'), 1050)
+        self.assertEqual(parse_money('007'), 700)
+        self.assertEqual(parse_money('.5'), 50)
+        self.assertEqual(scale_threshold(Decimal('12.30')), 1230)
+        for value in ('abc', '', '-1', '1.2.3', '1.-2', 'NaN', 'Infinity', '1e1000', None, -5, ' 10.005 ', 0.125):
+            with self.assertRaises(ValueError):
+                parse_money(value)
+
+    def test_terms_match_decimal_arithmetic(self):
+        for _ in range(1000):
+            discount_type = self.rng.choice(('cart', 'delivery'))
+            amount, cart_total, delivery_fee = self.random_amount(), self.random_amount(), self.random_amount()
+            terms = CampaignTerms(discount_type, parse_money(amount))
+            base = cart_total if discount_type == 'cart' else delivery_fee
+            self.assertEqual(terms.is_eligible(parse_money(cart_total), parse_money(delivery_fee)), base >= amount)
+
+            discount, new_cart, new_delivery = terms.apply(parse_money(cart_total), parse_money(delivery_fee))
+            self.assertEqual(format_money(discount), amount)
+            self.assertEqual(format_money(new_cart) + format_money(new_delivery) + amount, cart_total + delivery_fee)
+
+
+class ApplyDiscountTests(APITestCase):
+
+    def setUp(self):
+        targeting_index.clear()
+        self.customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        self.campaign = Campaign.objects.create(
+            name="Small Cart Discount",
+            discount_type="cart",
+            discount_amount=Decimal('0.30'),
+            start_date=timezone.now() - timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=1),
+            budget=10,
+            usage_limit_per_customer_per_day=1
+        )
+        self.campaign.target_customers.set([self.customer])
+
+    def test_threshold_compared_exactly(self):
+        # float('0.3') is just below Decimal('0.30').
+        response = self.client.get(reverse('campaign-available'), {'customer_id': self.customer.id, 'cart_total': '0.3'})
+        self.assertEqual(len(response.data), 1)
+
+        url = reverse('apply-discount', args=[self.campaign.id])
+        response = self.client.post(url, {'customer_id': self.customer.id, 'cart_total': '0.3', 'delivery_fee': '1.10'},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['discount_applied'], Decimal('0.30'))
+        self.assertEqual(response.data['new_cart_value'], Decimal('0.00'))
+        self.assertEqual(response.data['new_delivery_fee'], Decimal('1.10'))
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_spent, Decimal('0.30'))
+
+        response = self.client.post(url, {'customer_id': self.customer.id, 'cart_total': '5'}, format='json')
+        self.assertEqual(response.data['detail'], "Usage limit exceeded for today.")
+
+    def test_rejects_invalid_amounts(self):
+        url = reverse('apply-discount', args=[self.campaign.id])
+        response = self.client.post(url, {'customer_id': self.customer.id, 'cart_total': 'ten'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('campaign-available'), {'customer_id': self.customer.id, 'cart_total': '-1'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rejects_amounts_finer_than_a_cent(self):
+        self.campaign.discount_amount = Decimal('50.00')
+        self.campaign.budget = 100
+        self.campaign.save()
+        response = self.client.get(reverse('campaign-available'),
+                                   {'customer_id': self.customer.id, 'cart_total': '49.995'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        url = reverse('apply-discount', args=[self.campaign.id])
+        response = self.client.post(url, {'customer_id': self.customer.id, 'cart_total': '49.995'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_spent, 0)
 
+        response = self.client.get(reverse('campaign-available'),
+                                   {'customer_id': self.customer.id, 'cart_total': '49.99'})
+        self.assertEqual(response.data, [])
+        response = self.client.get(reverse('campaign-available'),
+                                   {'customer_id': self.customer.id, 'cart_total': '50.00'})
+        self.assertEqual([c['id'] for c in response.data], [self.campaign.id])
@@ -1,6 +1,6 @@
 from django.urls import path
 from .views import CampaignListCreateAPIView, CampaignDetailAPIView, AvailableCampaignAPIView, \
-    CustomerListCreateAPIView, CustomerDetailAPIView, ApplyDiscountView
+    CustomerListCreateAPIView, CustomerDetailAPIView, ApplyDiscountView, ChangeFeedAPIView
 
 urlpatterns = [
     path('campaigns', CampaignListCreateAPIView.as_view(), name='campaign-list'),
@@ -9,5 +9,6 @@ urlpatterns = [
     path('customers', CustomerListCreateAPIView.as_view(), name='customer-list'),
     path('customers/<int:pk>', CustomerDetailAPIView.as_view(), name='customer-detail'),
     path('campaigns/<int:campaign_id>/apply-discount', ApplyDiscountView.as_view(), name='apply-discount'),
+    path('changes', ChangeFeedAPIView.as_view(), name='change-feed'),
 ]
 
@@ -1,11 +1,22 @@
+import math
+import time
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+
+from django.db import transaction
+from django.db.models import F
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
+from .changes import record_usage, changes_since
+from .discounts import CampaignTerms, parse_money, format_money
 from .models import Campaign, Customer, CampaignUsageLog
-from .serializers import CampaignSerializer, CustomerSerializer
+from .serializers import CampaignSerializer, CustomerSerializer, ChangeEventSerializer
+from .catalog import campaign_catalog
+from .targeting import targeting_index
 
 
 def is_campaign_active(campaign):
@@ -32,11 +43,7 @@ def is_valid_campaign(campaign, customer, cart_total, delivery_fee):
     ).first()
     if usage_log and usage_log.usage_count >= campaign.usage_limit_per_customer_per_day:
         return False
-    if campaign.discount_type == 'cart' and cart_total >= campaign.discount_amount:
-        return True
-    if campaign.discount_type == 'delivery' and delivery_fee >= campaign.discount_amount:
-        return True
-    return False
+    return CampaignTerms.from_campaign(campaign).is_eligible(parse_money(cart_total), parse_money(delivery_fee))
 
 
 class CampaignListCreateAPIView(APIView):
@@ -49,7 +56,8 @@ class CampaignListCreateAPIView(APIView):
     def post(self, request):
         serializer = CampaignSerializer(data=request.data)
         if serializer.is_valid():
-            campaign = serializer.save()
+            with transaction.atomic():
+                campaign = serializer.save()
             return Response(CampaignSerializer(campaign).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -70,7 +78,8 @@ class CampaignDetailAPIView(APIView):
             return Response({"detail": "Campaign not found."}, status=status.HTTP_404_NOT_FOUND)
         serializer = CampaignSerializer(campaign, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -81,23 +90,44 @@ class CampaignDetailAPIView(APIView):
 
 
 class AvailableCampaignAPIView(APIView):
+    max_customer_id = 2 ** 63 - 1
 
     def get(self, request):
         customer_id = request.query_params.get('customer_id')
         try:
-            cart_total = float(request.query_params.get('cart_total', 0))
-            delivery_fee = float(request.query_params.get('delivery_fee', 0))
+            cart_total = parse_money(request.query_params.get('cart_total', 0))
+            delivery_fee = parse_money(request.query_params.get('delivery_fee', 0))
         except ValueError:
-            return Response({'error': 'cart_total and delivery_fee must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'error': 'cart_total and delivery_fee must be non-negative amounts with at most two decimal places'}, status=status.HTTP_400_BAD_REQUEST)
 
         if not customer_id:
             return Response({'error': 'customer_id is required'}, status=status.HTTP_400_BAD_REQUEST)
-
-        customer = get_object_or_404(Customer, pk=customer_id)
-        campaigns = Campaign.objects.prefetch_related('target_customers').filter(target_customers=customer)
-
-        valid_campaigns = [campaign for campaign in campaigns
-                           if is_valid_campaign(campaign, customer, cart_total, delivery_fee)]
+        try:
+            customer_id = int(customer_id)
+        except ValueError:
+            return Response({'error': 'customer_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not 0 < customer_id <= self.max_customer_id:
+            raise Http404('No Customer matches the given query.')
+
+        targeted_ids = campaign_catalog.targets(customer_id)
+        if targeted_ids is None:
+            targeted_ids = targeting_index.get(customer_id)
+        if targeted_ids is None:
+            raise Http404('No Customer matches the given query.')
+        if not targeted_ids:
+            return Response([])
+
+        now = timezone.now()
+        active_campaigns = Campaign.objects.filter(
+            pk__in=list(targeted_ids), start_date__lte=now, end_date__gte=now, total_spent__lt=F('budget')
+        )
+        campaigns = [
+            campaign for campaign in active_campaigns
+            if CampaignTerms.from_campaign(campaign).is_eligible(cart_total, delivery_fee)
+        ]
+
+        valid_campaigns = [campaign for campaign in campaigns if not has_exceeded_usage(campaign, customer_id)]
         serializer = CampaignSerializer(valid_campaigns, many=True)
         return Response(serializer.data)
 
@@ -144,15 +174,19 @@ class CustomerDetailAPIView(APIView):
 class ApplyDiscountView(APIView):
     def post(self, request, campaign_id):
         customer_id = request.data.get('customer_id')
-        cart_total = request.data.get('cart_total')
-        delivery_fee = request.data.get('delivery_fee')
+        try:
+            cart_total = parse_money(request.data.get('cart_total', 0))
+            delivery_fee = parse_money(request.data.get('delivery_fee', 0))
+        except ValueError:
+            return Response({'error': 'cart_total and delivery_fee must be non-negative amounts with at most two decimal places'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
             campaign = Campaign.objects.get(id=campaign_id)
         except Campaign.DoesNotExist:
             return Response({"detail": "Campaign not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        if not is_valid_campaign(campaign, customer_id, cart_total, delivery_fee):
+        terms = CampaignTerms.from_campaign(campaign)
+        if not is_campaign_active(campaign) or not terms.is_eligible(cart_total, delivery_fee):
             return Response(
                 {"detail": "Discount cannot be applied. Either campaign is not active, or the conditions are not met."},
                 status=status.HTTP_400_BAD_REQUEST)
@@ -160,35 +194,61 @@ class ApplyDiscountView(APIView):
         if has_exceeded_usage(campaign, customer_id):
             return Response({"detail": "Usage limit exceeded for today."}, status=status.HTTP_400_BAD_REQUEST)
 
-        discount_applied = 0
-        if campaign.discount_type == "cart":
-            discount_applied = campaign.discount_amount
-            cart_total -= discount_applied
-
-        elif campaign.discount_type == "delivery":
-            discount_applied = campaign.discount_amount
-            delivery_fee -= discount_applied
-
-        campaign.total_spent += discount_applied
-        campaign.save()
-
-        today = timezone.now().date()
-        usage_log = CampaignUsageLog.objects.filter(campaign=campaign, customer=customer_id, date=today).first()
-        if usage_log:
-            usage_log.usage_count += 1
-            usage_log.save()
-        else:
-            CampaignUsageLog.objects.create(
-                campaign=campaign,
-                customer_id=customer_id,
-                date=today,
-                usage_count=1
-            )
+        discount, cart_total, delivery_fee = terms.apply(cart_total, delivery_fee)
+        discount_applied = format_money(discount)
+
+        with transaction.atomic():
+            campaign.total_spent += discount_applied
+            campaign.save()
+
+            today = timezone.now().date()
+            usage_log = CampaignUsageLog.objects.filter(campaign=campaign, customer=customer_id, date=today).first()
+            if usage_log:
+                usage_log.usage_count += 1
+                usage_log.save()
+            else:
+                usage_log = CampaignUsageLog.objects.create(
+                    campaign=campaign,
+                    customer_id=customer_id,
+                    date=today,
+                    usage_count=1
+                )
+            record_usage(usage_log, campaign.discount_type, discount_applied)
 
         return Response({
             "detail": "Discount applied successfully.",
             "discount_type": campaign.discount_type,
             "discount_applied": discount_applied,
-            "new_cart_value": cart_total,
-            "new_delivery_fee": delivery_fee
+            "new_cart_value": format_money(cart_total),
+            "new_delivery_fee": format_money(delivery_fee)
         }, status=status.HTTP_200_OK)
+
+
+class ChangeFeedAPIView(APIView):
+    max_cursor = 2 ** 63 - 1
+    max_limit = 1000
+    max_wait = 30
+    poll_interval = 0.5
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = min(int(request.query_params.get('limit', 100)), self.max_limit)
+            wait = float(request.query_params.get('wait', 0))
+        except ValueError:
+            return Response({'error': 'since, limit and wait must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 <= since <= self.max_cursor or limit < 1 or not math.isfinite(wait) or wait < 0:
+            return Response({'error': 'since and wait must be finite and not negative and limit must be positive'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        deadline = time.monotonic() + min(wait, self.max_wait)
+        while True:
+            changes = list(changes_since(since)[:limit])
+            if changes or time.monotonic() >= deadline:
+                break
+            time.sleep(self.poll_interval)
+
+        return Response({
+            'changes': ChangeEventSerializer(changes, many=True).data,
+            'next': changes[-1].id if changes else since,
+        })